@@ -1,11 +1,49 @@
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
+def _year_columns(df):
+    """Columnas de años 1961-2022, con el nombre del CSV (F1961) o solo el número (1961)."""
+    columns = []
+    for col in df.columns:
+        digits = str(col)[1:] if str(col).startswith('F') else str(col)
+        if digits.isdigit() and 1961 <= int(digits) <= 2022:
+            columns.append(col)
+    return columns
+
+def _country_column(df):
+    """Nombre de la columna de países ('Country' en el CSV)."""
+    return next((col for col in ('Country', 'country') if col in df.columns), None)
+
+def analyze_climate(df):
+    """
+    Calcula las métricas que usan generate_visualizations y create_final_report
+    (tendencia global, medias por año y tendencias/anomalías por país)
+    """
+    # Cálculo vectorizado sobre la matriz países x años
+    import pandas as pd
+    from analytics import ClimateAnalytics
+
+    year_columns = _year_columns(df)
+    if not year_columns:
+        return {}
+    first_year = int(str(year_columns[0]).lstrip('F'))
+    analytics = ClimateAnalytics(df[year_columns].to_numpy(dtype=float), first_year=first_year)
+    country_col = _country_column(df)
+    countries = df[country_col] if country_col else df.index
+
+    return {
+        'analytics': analytics,
+        'global_warming_trend': analytics.global_trend,
+        'yearly_means': pd.Series(analytics.year_mean, index=analytics.years),
+        'country_trends': pd.Series(analytics.trend, index=countries),
+        'country_max_anomaly': pd.Series(analytics.max_anomaly, index=countries),
+        'decadal_means': pd.DataFrame(analytics.decadal, index=countries, columns=analytics.decades),
+    }
 
 def generate_visualizations(analysis_results, df):
     """
     Genera visualizaciones para el análisis climático
     """
+    # Import tardío: matplotlib solo se carga si se generan gráficos
+    import matplotlib.pyplot as plt
+
     plt.style.use('seaborn-v0_8')
     
     # 1. Tendencia temporal global
@@ -19,9 +57,9 @@ def generate_visualizations(analysis_results, df):
         plt.show()
     
     # 2. Distribución de temperaturas
-    year_columns = [col for col in df.columns if col.isdigit() and 1961 <= int(col) <= 2022]
+    year_columns = _year_columns(df)
     if year_columns:
-        recent_year = max(year_columns, key=int)
+        recent_year = year_columns[-1]
         plt.figure(figsize=(10, 6))
         df[recent_year].hist(bins=30)
         plt.title(f'Distribución de Temperaturas ({recent_year})')
@@ -31,11 +69,16 @@ def generate_visualizations(analysis_results, df):
     
     # 3. Top 10 países más cálidos
     if year_columns:
-        df['mean_temp'] = df[year_columns].mean(axis=1)
-        top10_warmest = df.nlargest(10, 'mean_temp')[['country', 'mean_temp']]
+        # Sumas por país repartidas entre procesos (en serie si hay pocas filas)
+        from parallel import aggregate
+        _, row_sums, row_counts = aggregate(df[year_columns].to_numpy(dtype=float))
+        df['mean_temp'] = row_sums / row_counts
+        country_col = _country_column(df)
+        top10_warmest = df.nlargest(10, 'mean_temp')
+        labels = top10_warmest[country_col] if country_col else top10_warmest.index
         
         plt.figure(figsize=(12, 6))
-        plt.barh(top10_warmest['country'], top10_warmest['mean_temp'])
+        plt.barh(labels, top10_warmest['mean_temp'])
         plt.title('Top 10 Países con Mayor Temperatura Media')
         plt.xlabel('Temperatura Media (°C)')
         plt.tight_layout()
@@ -62,4 +105,13 @@ def create_final_report(analysis_results):
         print(f"📊 Cambio total: {change:+.2f}°C")
     
     print("="*60)
-    
\ No newline at end of file
+    
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    df = pd.read_csv("dataset_climate_change.csv")
+    results = analyze_climate(df)
+    generate_visualizations(results, df)
+    create_final_report(results)
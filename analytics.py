@@ -0,0 +1,110 @@
+import numpy as np
+
+from dataset import FIRST_YEAR, get_dataset
+
+BASELINE = (1961, 1990)  # período de referencia para las anomalías
+
+
+# -----------------------
+# Operaciones sobre la matriz (filas = países, columnas = años), ignorando NaN
+# -----------------------
+def trend_slopes(matrix, years):
+    """Pendiente de la recta de mínimos cuadrados de cada fila (°C/año).
+    NaN si la fila tiene menos de dos datos."""
+    present = ~np.isnan(matrix)
+    y = np.where(present, matrix, 0.0)
+    x = np.where(present, np.asarray(years, dtype=float), 0.0)
+    n = present.sum(axis=1)
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxx, sxy = (x * x).sum(axis=1), (x * y).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    slope[n < 2] = np.nan
+    return slope
+
+
+def decadal_means(matrix, years):
+    """Media de cada fila por década (1960s, 1970s, ...). Retorna (inicios de década, matriz filas x décadas)."""
+    decades = np.asarray(years) // 10 * 10
+    starts = np.flatnonzero(np.r_[True, decades[1:] != decades[:-1]])
+    present = ~np.isnan(matrix)
+    sums = np.add.reduceat(np.where(present, matrix, 0.0), starts, axis=1)
+    counts = np.add.reduceat(present, starts, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return decades[starts], sums / counts
+
+
+def anomalies(matrix, years, baseline=BASELINE):
+    """Diferencia de cada valor con la media de su fila en el período base. Retorna (anomalías, medias base)."""
+    years = np.asarray(years)
+    columns = (years >= baseline[0]) & (years <= baseline[1])
+    block = matrix[:, columns]
+    present = ~np.isnan(block)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        base = np.where(present, block, 0.0).sum(axis=1) / present.sum(axis=1)
+    return matrix - base[:, None], base
+
+
+def rolling_means(matrix, window=10):
+    """Media móvil de `window` años por fila (sumas acumuladas). Las primeras window-1 columnas quedan NaN,
+    igual que los tramos sin ningún dato."""
+    present = ~np.isnan(matrix)
+    zeros = np.zeros((matrix.shape[0], 1))
+    sums = np.concatenate([zeros, np.cumsum(np.where(present, matrix, 0.0), axis=1)], axis=1)
+    counts = np.concatenate([zeros, np.cumsum(present, axis=1)], axis=1)
+    result = np.full(matrix.shape, np.nan)
+    if window <= matrix.shape[1]:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[:, window - 1:] = ((sums[:, window:] - sums[:, :-window])
+                                      / (counts[:, window:] - counts[:, :-window]))
+    return result
+
+
+def _nanmax_rows(matrix):
+    # fmax ignora NaN; una fila sin datos queda NaN (sin el warning de np.nanmax)
+    return np.fmax.reduce(matrix, axis=1) if matrix.shape[1] else np.full(matrix.shape[0], np.nan)
+
+
+class ClimateAnalytics:
+    """Métricas por país calculadas de una vez sobre toda la matriz.
+    Los arreglos por país siguen el orden de filas de la matriz (el del CSV)."""
+
+    # Métricas escalares por país (utilizables como clave alternativa del árbol)
+    METRICS = ("trend", "baseline_mean", "max_anomaly", "last_anomaly")
+
+    def __init__(self, matrix, iso3=None, first_year=FIRST_YEAR, baseline=BASELINE, window=10):
+        self.iso3 = iso3
+        self.years = np.arange(first_year, first_year + matrix.shape[1])
+
+        self.trend = trend_slopes(matrix, self.years)
+        self.decades, self.decadal = decadal_means(matrix, self.years)
+        self.anomalies, self.baseline_mean = anomalies(matrix, self.years, baseline)
+        self.max_anomaly = _nanmax_rows(self.anomalies)
+        self.last_anomaly = self.anomalies[:, -1]
+        self.rolling = rolling_means(matrix, window)
+
+        # Serie global: media de cada año entre países y su tendencia
+        present = ~np.isnan(matrix)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.year_mean = np.where(present, matrix, 0.0).sum(axis=0) / present.sum(axis=0)
+        self.global_trend = float(trend_slopes(self.year_mean[None, :], self.years)[0])
+
+    def by_iso(self, metric):
+        """Diccionario ISO3 -> valor de una métrica escalar (NaN -> None)."""
+        if metric not in self.METRICS:
+            raise ValueError(f"métrica desconocida: {metric}")
+        values = getattr(self, metric).tolist()
+        return {iso: (None if v != v else v) for iso, v in zip(self.iso3.tolist(), values)}
+
+
+_cache = {}
+
+
+def get_analytics(path="dataset_climate_change.csv"):
+    """ClimateAnalytics del CSV, recalculado solo si el dataset se recargó (mtime)."""
+    ds = get_dataset(path)
+    cached = _cache.get(ds.path)
+    if cached is None or cached[0] != ds.mtime:
+        cached = (ds.mtime, ClimateAnalytics(ds.matrix, ds.iso3))
+        _cache[ds.path] = cached
+    return cached[1]
@@ -1,16 +1,111 @@
+import math
 from collections import deque
 
+from instrumentation import TIMED_OPERATIONS, TreeStats, timed
+
+
+# -----------------------
+# Funciones de clave (nodo -> valor por el que se ordena el árbol)
+# -----------------------
+def mean_key(node):
+    return node.mean
+
+
+def year_key(year):
+    """Ordena por el valor de un año 1961-2022 (sin dato = al final). ValueError fuera de ese rango."""
+    if not 1961 <= year <= 2022:
+        raise ValueError(f"año fuera de rango (1961-2022): {year}")
+    idx = year - 1961
+
+    def key(node):
+        if node.values is None or idx >= len(node.values):
+            return None
+        return node.values[idx]
+    return key
+
+
+def lookup_key(values_by_iso):
+    """Ordena por un valor precalculado por ISO3 (p. ej. ClimateAnalytics.by_iso("trend"))."""
+    def key(node):
+        return values_by_iso.get(node.iso3)
+    return key
+
+
 class AVLTree:
 
+    def __init__(self, key=mean_key):
+        # Valor por el que se ordena; la clave de cada nodo es (key(nodo), iso3)
+        self.key = key
+        # Índice secundario ISO3 -> nodo, se mantiene en inserción y eliminación
+        self.iso_index = {}
+        # Instrumentación opcional (None = desactivada, sin costo)
+        self.stats = None
+        # Agregados por año de los nodos presentes (None = desactivados)
+        self.aggregates = None
+
+    # -----------------------
+    # Instrumentación
+    # -----------------------
+    def enable_stats(self, hook=None):
+        """Activa los contadores y el cronometraje por operación; retorna el TreeStats."""
+        if self.stats is None:
+            self.stats = TreeStats(hook)
+            for name in TIMED_OPERATIONS:
+                method = getattr(type(self), name).__get__(self)
+                setattr(self, name, timed(self.stats, name, method))
+        return self.stats
+
+    def disable_stats(self):
+        for name in TIMED_OPERATIONS:
+            self.__dict__.pop(name, None)
+        self.stats = None
+
+    def enable_aggregates(self, root, years=62, source=None):
+        """Calcula los agregados por año del árbol actual y los mantiene en cada inserción/eliminación.
+        source: CSV del que se cargó el árbol tal cual (sin cambios todavía); permite que las
+        consultas por año usen los arreglos precalculados del dataset."""
+        # Import tardío: numpy solo hace falta si se usan los agregados
+        from stats import LiveAggregates
+        nodes = list(self.inorder(root))
+        self.aggregates = LiveAggregates(years).add_nodes(nodes)
+        # Nodos sin values (carga por streaming) no coinciden con las filas del dataset
+        if source is not None and all(node.values is not None for node in nodes):
+            self.aggregates.track(source, {node.iso3 for node in nodes})
+        return self.aggregates
+
+    def disable_aggregates(self):
+        self.aggregates = None
+
+    def health(self, root):
+        """Altura real vs. la mínima posible para la cantidad de nodos."""
+        n = self.get_size(root)
+        return {"size": n, "height": self.get_height(root), "min_height": n.bit_length()}
+
     # -----------------------
     # Utilidades básicas
     # -----------------------
+    def make_key(self, node):
+        """Calcula y guarda en node la clave (valor, iso3). Sin valor (None/NaN) va al final."""
+        value = self.key(node)
+        if value is None or value != value:
+            value = math.inf
+        node.key = (value, node.iso3)
+        return node.key
+
     def get_height(self, root):
         return 0 if not root else root.height
 
     def get_balance(self, root):
         return 0 if not root else self.get_height(root.left) - self.get_height(root.right)
 
+    def get_size(self, root):
+        return 0 if not root else root.size
+
+    def update_node(self, root):
+        """Recalcula altura y tamaño del subárbol a partir de los hijos."""
+        root.height = 1 + max(self.get_height(root.left), self.get_height(root.right))
+        root.size = 1 + self.get_size(root.left) + self.get_size(root.right)
+
     # -----------------------
     # Rotaciones
     # -----------------------
@@ -38,9 +133,9 @@ class AVLTree:
             else:
                 prev_parent.right = x
 
-        # Actualizar alturas
-        y.height = 1 + max(self.get_height(y.left), self.get_height(y.right))
-        x.height = 1 + max(self.get_height(x.left), self.get_height(x.right))
+        # Actualizar alturas y tamaños
+        self.update_node(y)
+        self.update_node(x)
         return x
 
     def left_rotate(self, x):
@@ -67,107 +162,303 @@ class AVLTree:
             else:
                 prev_parent.right = y
 
-        # Se actualiza la altura
-        x.height = 1 + max(self.get_height(x.left), self.get_height(x.right))
-        y.height = 1 + max(self.get_height(y.left), self.get_height(y.right))
+        # Se actualizan altura y tamaño
+        self.update_node(x)
+        self.update_node(y)
         return y
 
+    # -----------------------
+    # Rebalanceo hacia arriba (por punteros parent)
+    # -----------------------
+    def _rebalance(self, root):
+        """Actualiza root y lo rota si está desbalanceado; retorna la raíz del subárbol."""
+        self.update_node(root)
+        balance = self.get_balance(root)
+        if balance > 1:
+            double = self.get_balance(root.left) < 0
+            if double:
+                self.left_rotate(root.left)
+            if self.stats is not None:
+                self.stats.record_rotation(double)
+            return self.right_rotate(root)
+        if balance < -1:
+            double = self.get_balance(root.right) > 0
+            if double:
+                self.right_rotate(root.right)
+            if self.stats is not None:
+                self.stats.record_rotation(double)
+            return self.left_rotate(root)
+        return root
+
+    def _retrace(self, node):
+        """Sube desde node hasta la raíz rebalanceando y retorna la raíz del árbol.
+        En cuanto la altura de un subárbol no cambia, arriba solo se ajustan los tamaños."""
+        height_changed = True
+        while True:
+            if height_changed:
+                old_height = node.height
+                node = self._rebalance(node)
+                height_changed = node.height != old_height
+            else:
+                node.size = 1 + self.get_size(node.left) + self.get_size(node.right)
+            if not node.parent:
+                return node
+            node = node.parent
+
+    def _replace_child(self, parent, old, new):
+        """Cuelga new donde estaba old bajo parent (parent None = raíz)."""
+        if parent:
+            if parent.left is old:
+                parent.left = new
+            else:
+                parent.right = new
+        if new:
+            new.parent = parent
+
     # -----------------------
     # Inserción
     # -----------------------
     def insert(self, root, node):
+        """Inserta node (iterativo) y retorna la nueva raíz, siempre con parent = None.
+        El ISO3 identifica al país: si ya está en el árbol se lanza ValueError sin modificarlo."""
+        if node.iso3 in self.iso_index:
+            raise ValueError(f"ya existe un nodo con ISO3 {node.iso3}")
+        self.iso_index[node.iso3] = node
+        if self.aggregates is not None:
+            self.aggregates.add(node)
+        key = self.make_key(node)
         if not root:
+            node.parent = None
             return node
 
-        # Clave compuesta (mean, iso3) para evitar duplicados
-        if (node.mean, node.iso3) < (root.mean, root.iso3):
-            root.left = self.insert(root.left, node)
-            if root.left:
-                root.left.parent = root
-        else:
-            root.right = self.insert(root.right, node)
-            if root.right:
-                root.right.parent = root
+        # Descenso único por la clave precalculada (valor, iso3) hasta una hoja
+        current = root
+        visited = 0
+        while True:
+            visited += 1
+            if key < current.key:
+                if not current.left:
+                    current.left = node
+                    break
+                current = current.left
+            else:
+                if not current.right:
+                    current.right = node
+                    break
+                current = current.right
+        node.parent = current
+        if self.stats is not None:
+            self.stats.record_descent(visited, visited)
 
-        # Se actualiza la altura
-        root.height = 1 + max(self.get_height(root.left), self.get_height(root.right))
-        balance = self.get_balance(root)
+        # Se suben los padres actualizando alturas/tamaños y rotando
+        return self._retrace(current)
 
-        # Re-balancear
-        if balance > 1 and (node.mean, node.iso3) < (root.left.mean, root.left.iso3):
-            return self.right_rotate(root)
-        if balance < -1 and (node.mean, node.iso3) > (root.right.mean, root.right.iso3):
-            return self.left_rotate(root)
-        if balance > 1 and (node.mean, node.iso3) > (root.left.mean, root.left.iso3):
-            root.left = self.left_rotate(root.left)
-            if root.left:
-                root.left.parent = root
-            return self.right_rotate(root)
-        if balance < -1 and (node.mean, node.iso3) < (root.right.mean, root.right.iso3):
-            root.right = self.right_rotate(root.right)
-            if root.right:
-                root.right.parent = root
-            return self.left_rotate(root)
+    # -----------------------
+    # Construcción masiva
+    # -----------------------
+    def bulk_load(self, nodes):
+        """Calcula la clave de cada nodo, los ordena una sola vez y construye el árbol balanceado."""
+        for node in nodes:
+            self.make_key(node)
+        ordered = sorted(nodes, key=lambda n: n.key)
+        return self.build_from_sorted(ordered)
+
+    def build_from_sorted(self, nodes):
+        """Construye un AVL perfectamente balanceado en O(n) a partir de nodos ya ordenados
+        y con la clave calculada (make_key). Reemplaza el contenido del árbol.
+        Igual que insert, lanza ValueError (sin modificar el árbol) si un ISO3 se repite."""
+        index = self.build_iso_index(nodes)
+        if self.aggregates is not None:
+            self.aggregates.reset()
+            self.aggregates.add_nodes(nodes)
+        return self._build_sorted(nodes, index)
+
+    def build_iso_index(self, nodes):
+        """Diccionario ISO3 -> nodo; ValueError si un ISO3 aparece dos veces."""
+        index = {}
+        for node in nodes:
+            if node.iso3 in index:
+                raise ValueError(f"ya existe un nodo con ISO3 {node.iso3}")
+            index[node.iso3] = node
+        return index
+
+    def _build_sorted(self, nodes, index=None):
+        """Parte estructural de build_from_sorted (no toca los agregados)."""
+        self.iso_index = self.build_iso_index(nodes) if index is None else index
+        root = self._build_range(nodes, 0, len(nodes))
+        if root:
+            root.parent = None
+        return root
 
+    def _build_range(self, nodes, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        root = nodes[mid]
+        root.left = self._build_range(nodes, lo, mid)
+        root.right = self._build_range(nodes, mid + 1, hi)
+        if root.left:
+            root.left.parent = root
+        if root.right:
+            root.right.parent = root
+        self.update_node(root)
         return root
 
     # -----------------------
-    # Recorrido por niveles (recursivo)
+    # Recorridos iterativos (generadores)
     # -----------------------
-    def level_order(self, root):
-        """Recorrido por niveles recursivo (nivel raíz = 0)."""
-        if not root:
-            return []
-
-        h = self.get_height(root)
-        result = []
-        for lvl in range(h):
-            result.extend(self._get_nodes_at_level(root, lvl, 0))
-        return result
+    def inorder(self, root):
+        """Genera los nodos en orden de clave sin recursión."""
+        stack = []
+        node = root
+        while stack or node:
+            if node:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                yield node
+                node = node.right
+
+    def preorder(self, root):
+        """Genera los nodos en preorden sin recursión."""
+        stack = [root] if root else []
+        while stack:
+            node = stack.pop()
+            yield node
+            if node.right:
+                stack.append(node.right)
+            if node.left:
+                stack.append(node.left)
+
+    def iter_level_order(self, root):
+        """Genera (nodo, nivel) por anchura usando una cola (nivel raíz = 0)."""
+        queue = deque([(root, 0)]) if root else deque()
+        while queue:
+            node, lvl = queue.popleft()
+            yield node, lvl
+            if node.left:
+                queue.append((node.left, lvl + 1))
+            if node.right:
+                queue.append((node.right, lvl + 1))
 
-    def _get_nodes_at_level(self, node, level, current_level):
-        if not node:
-            return []
-        if level == 0:
-            return [(node.iso3, node.mean, current_level)]
-        left = self._get_nodes_at_level(node.left, level - 1, current_level + 1)
-        right = self._get_nodes_at_level(node.right, level - 1, current_level + 1)
-        return left + right
+    def level_order(self, root):
+        """Recorrido por niveles (nivel raíz = 0): lista de (iso3, valor de clave, nivel).
+        Con la clave por defecto el valor es la media."""
+        return [(node.iso3, node.key[0], lvl) for node, lvl in self.iter_level_order(root)]
 
     # -----------------------
     # Búsquedas
     # -----------------------
     def search_all(self, root, mean, tol=1e-9):
-        """Devuelve todos los nodos cuya media coincide exactamente (tol por flotantes)."""
-        if not root:
-            return []
+        """Devuelve (en orden) todos los nodos cuyo valor de clave (la media por defecto) coincide
+        exactamente (tol por flotantes). Solo desciende a los subárboles cuyo rango puede contenerlo."""
+        lo, hi = mean - tol, mean + tol
         res = []
-        if abs(root.mean - mean) < tol:
-            res.append(root)
-        res.extend(self.search_all(root.left, mean, tol))
-        res.extend(self.search_all(root.right, mean, tol))
+        stack = []
+        node = root
+        visited = 0
+        while stack or node:
+            if node:
+                visited += 1
+                if node.key[0] > lo:
+                    stack.append(node)
+                    node = node.left
+                else:
+                    node = node.right
+            else:
+                node = stack.pop()
+                if node.key[0] >= hi:
+                    break
+                res.append(node)
+                node = node.right
+        if self.stats is not None:
+            # Recorre un rango, no un camino: no cuenta para la profundidad
+            self.stats.record_descent(visited, visited, depth=0)
         return res
 
+    def range(self, root, lo, hi):
+        """Itera en orden los nodos con lo <= valor de clave <= hi en O(log n + k)."""
+        stack = []
+        node = root
+        while stack or node:
+            if node:
+                if node.key[0] >= lo:
+                    stack.append(node)
+                    node = node.left
+                else:
+                    # node y su subárbol izquierdo quedan por debajo de lo
+                    node = node.right
+            else:
+                node = stack.pop()
+                if node.key[0] > hi:
+                    return
+                yield node
+                node = node.right
+
     def search_by_iso(self, root, iso3):
-        """Busca un nodo por ISO3 recorriendo todo el árbol."""
+        """Busca un nodo por ISO3 en O(1) usando el índice secundario."""
         if not root:
             return None
-        if root.iso3 == iso3:
-            return root
-        left = self.search_by_iso(root.left, iso3)
-        if left:
-            return left
-        return self.search_by_iso(root.right, iso3)
+        return self.iso_index.get(iso3)
 
     def get_all_nodes(self, root):
         """Recorrido inorder (para depuración)."""
-        if not root:
-            return []
-        res = []
-        res.extend(self.get_all_nodes(root.left))
-        res.append(root)
-        res.extend(self.get_all_nodes(root.right))
-        return res
+        return list(self.inorder(root))
+
+    # -----------------------
+    # Estadísticos de orden (usan node.size)
+    # -----------------------
+    def rank(self, root, mean, inclusive=False):
+        """Cantidad de nodos con valor de clave < mean (<= si inclusive) en O(log n)."""
+        count = 0
+        node = root
+        visited = 0
+        while node:
+            visited += 1
+            value = node.key[0]
+            if value < mean or (inclusive and value == mean):
+                count += self.get_size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        if self.stats is not None:
+            self.stats.record_descent(visited, visited)
+        return count
+
+    def select(self, root, k):
+        """k-ésimo nodo (desde 0) en orden de clave; None si k está fuera de rango."""
+        if k < 0 or k >= self.get_size(root):
+            return None
+        node = root
+        visited = 0
+        while node:
+            visited += 1
+            left = self.get_size(node.left)
+            if k < left:
+                node = node.left
+            elif k == left:
+                if self.stats is not None:
+                    self.stats.record_descent(visited, visited)
+                return node
+            else:
+                k -= left + 1
+                node = node.right
+        return None
+
+    def count_range(self, root, lo, hi):
+        """Cantidad de nodos con lo <= valor de clave <= hi en O(log n)."""
+        if lo > hi:
+            return 0
+        return self.rank(root, hi, inclusive=True) - self.rank(root, lo)
+
+    def percentile(self, root, p):
+        """Nodo en el percentil p (0-100) por rango más cercano; None si el árbol está vacío."""
+        n = self.get_size(root)
+        if n == 0:
+            return None
+        k = math.ceil(p / 100 * n) - 1
+        return self.select(root, min(max(k, 0), n - 1))
 
     # -----------------------
     # Eliminación
@@ -178,85 +469,194 @@ class AVLTree:
             current = current.left
         return current
 
-    def delete_one_by_key(self, root, key):
-        """Elimina un nodo por clave exacta (mean, iso3)."""
-        if not root:
-            return None
+    def find(self, root, key):
+        """Busca el nodo con clave exacta (valor, iso3) en O(log n)."""
+        node = root
+        visited = comparisons = 0
+        while node:
+            visited += 1
+            node_key = node.key
+            if key < node_key:
+                comparisons += 1
+                node = node.left
+            elif key > node_key:
+                comparisons += 2
+                node = node.right
+            else:
+                comparisons += 2
+                break
+        if self.stats is not None:
+            self.stats.record_descent(visited, comparisons)
+        return node
 
-        if key < (root.mean, root.iso3):
-            root.left = self.delete_one_by_key(root.left, key)
-            if root.left:
-                root.left.parent = root
-        elif key > (root.mean, root.iso3):
-            root.right = self.delete_one_by_key(root.right, key)
-            if root.right:
-                root.right.parent = root
-        else:
-            # Nodo encontrado
-            if not root.left:
-                temp = root.right
-                if temp:
-                    temp.parent = root.parent
-                return temp
-            elif not root.right:
-                temp = root.left
-                if temp:
-                    temp.parent = root.parent
-                return temp
+    def delete_one_by_key(self, root, key):
+        """Elimina un nodo por clave exacta (valor, iso3) y retorna la nueva raíz."""
+        node = self.find(root, key)
+        if not node:
+            return root
+        return self.remove_node(node)
+
+    def remove_node(self, node):
+        """Desengancha node del árbol (iterativo) y retorna la nueva raíz."""
+        # Se retira del índice ISO3
+        if self.iso_index.get(node.iso3) is node:
+            del self.iso_index[node.iso3]
+        if self.aggregates is not None:
+            self.aggregates.remove(node)
+        return self._unlink(node)
+
+    def _unlink(self, node):
+        """Parte estructural de remove_node (no toca el índice ISO3)."""
+        if node.left and node.right:
+            # El sucesor ocupa el lugar de node; no se copian campos entre nodos
+            succ = self.get_min_value_node(node.right)
+            if succ.parent is node:
+                start = succ
             else:
-                temp = self.get_min_value_node(root.right)
-                root.country, root.iso3, root.values, root.mean = (
-                    temp.country, temp.iso3, temp.values, temp.mean
-                )
-                root.right = self.delete_one_by_key(root.right, (temp.mean, temp.iso3))
-                if root.right:
-                    root.right.parent = root
-
-        # Se actualiza la altura y se balancea
-        root.height = 1 + max(self.get_height(root.left), self.get_height(root.right))
-        balance = self.get_balance(root)
+                start = succ.parent
+                self._replace_child(succ.parent, succ, succ.right)
+                succ.right = node.right
+                succ.right.parent = succ
+            succ.left = node.left
+            succ.left.parent = succ
+            self._replace_child(node.parent, node, succ)
+            # Hereda la altura/tamaño previos del lugar para detectar cambios al subir
+            succ.height, succ.size = node.height, node.size
+        else:
+            start = node.parent
+            child = node.left or node.right
+            self._replace_child(node.parent, node, child)
+            if not start:
+                # Era la raíz
+                self._reset_node(node)
+                return child
 
-        if balance > 1 and self.get_balance(root.left) >= 0:
-            return self.right_rotate(root)
-        if balance > 1 and self.get_balance(root.left) < 0:
-            root.left = self.left_rotate(root.left)
-            if root.left:
-                root.left.parent = root
-            return self.right_rotate(root)
-        if balance < -1 and self.get_balance(root.right) <= 0:
-            return self.left_rotate(root)
-        if balance < -1 and self.get_balance(root.right) > 0:
-            root.right = self.right_rotate(root.right)
-            if root.right:
-                root.right.parent = root
-            return self.left_rotate(root)
+        self._reset_node(node)
+        return self._retrace(start)
 
-        return root
+    def _reset_node(self, node):
+        node.left = node.right = node.parent = None
+        node.height = node.size = 1
 
     def delete_all(self, root, mean, tol=1e-9):
-        """Elimina TODOS los nodos con la media exacta."""
-        nodes = self.search_all(root, mean, tol)
-        eliminados = []
-        for n in nodes:
-            key = (n.mean, n.iso3)
-            root = self.delete_one_by_key(root, key)
-            eliminados.append(n.iso3)
-            if root:
-                root.parent = None
-        return root, eliminados
+        """Elimina TODOS los nodos con el valor de clave exacto (un solo split/join)."""
+        return self._cut(root, lambda n: n.key[0] <= mean - tol, lambda n: n.key[0] < mean + tol)
+
+    def delete_range(self, root, lo, hi):
+        """Elimina todos los nodos con lo <= valor de clave <= hi. Retorna (raíz, ISO3 eliminados)."""
+        if lo > hi:
+            return root, []
+        return self._cut(root, lambda n: n.key[0] < lo, lambda n: n.key[0] <= hi)
+
+    def delete_keys(self, root, keys):
+        """Elimina un conjunto de claves (valor, iso3). Retorna (raíz, ISO3 eliminados).
+        Si son pocas se eliminan una a una; si no, se reconstruye el árbol en O(n)."""
+        keys = set(keys)
+        n = self.get_size(root)
+        if len(keys) * max(n, 1).bit_length() < n:
+            eliminados = []
+            for key in sorted(keys):
+                node = self.find(root, key)
+                if node:
+                    eliminados.append(node.iso3)
+                    root = self.remove_node(node)
+            return root, eliminados
+
+        kept, removed = [], []
+        for node in self.inorder(root):
+            (removed if node.key in keys else kept).append(node)
+        for node in removed:
+            if self.aggregates is not None:
+                self.aggregates.remove(node)
+            self._reset_node(node)
+        return self._build_sorted(kept), [node.iso3 for node in removed]
+
+    # -----------------------
+    # Split / join (eliminación por bandas)
+    # -----------------------
+    def join(self, left, pivot, right):
+        """Une dos AVL sueltos con left < pivot < right y retorna la raíz resultante."""
+        hl, hr = self.get_height(left), self.get_height(right)
+        if hl > hr + 1:
+            # Se baja por el borde derecho de left hasta una altura compatible
+            parent, current = None, left
+            while current and current.height > hr + 1:
+                parent, current = current, current.right
+            self._attach(pivot, current, right)
+            parent.right = pivot
+            pivot.parent = parent
+            return self._retrace(parent)
+        if hr > hl + 1:
+            parent, current = None, right
+            while current and current.height > hl + 1:
+                parent, current = current, current.left
+            self._attach(pivot, left, current)
+            parent.left = pivot
+            pivot.parent = parent
+            return self._retrace(parent)
+        self._attach(pivot, left, right)
+        pivot.parent = None
+        return pivot
+
+    def _attach(self, pivot, left, right):
+        pivot.left, pivot.right = left, right
+        if left:
+            left.parent = pivot
+        if right:
+            right.parent = pivot
+        self.update_node(pivot)
+
+    def _join2(self, left, right):
+        """Une dos AVL sueltos con left < right usando el mínimo de right como pivote."""
+        if not left:
+            return right
+        if not right:
+            return left
+        pivot = self.get_min_value_node(right)
+        right = self._unlink(pivot)
+        return self.join(left, pivot, right)
+
+    def _split(self, root, goes_left):
+        """Divide root en (L, R): L tiene los nodos con goes_left(nodo) verdadero (un prefijo en orden)."""
+        if not root:
+            return None, None
+        left, right = root.left, root.right
+        if left:
+            left.parent = None
+        if right:
+            right.parent = None
+        root.parent = None
+        if goes_left(root):
+            low, high = self._split(right, goes_left)
+            return self.join(left, root, low), high
+        low, high = self._split(left, goes_left)
+        return low, self.join(high, root, right)
+
+    def _cut(self, root, before, inside):
+        """Quita la banda contigua de nodos con not before(n) and inside(n)."""
+        left, rest = self._split(root, before)
+        middle, right = self._split(rest, inside)
+        removed = list(self.inorder(middle))
+        for node in removed:
+            if self.iso_index.get(node.iso3) is node:
+                del self.iso_index[node.iso3]
+            if self.aggregates is not None:
+                self.aggregates.remove(node)
+            self._reset_node(node)
+        return self._join2(left, right), [node.iso3 for node in removed]
 
     # -----------------------
     # Operaciones familiares
     # -----------------------
     def get_level(self, root, node, level=0):
-        if not root:
-            return -1
-        if root == node:
-            return level
-        down = self.get_level(root.left, node, level + 1)
-        if down != -1:
-            return down
-        return self.get_level(root.right, node, level + 1)
+        """Nivel de node respecto a root subiendo por los padres (-1 si no cuelga de root)."""
+        current = node
+        while current:
+            if current is root:
+                return level
+            current = current.parent
+            level += 1
+        return -1
 
     def get_parent(self, node):
         return node.parent if node else None
@@ -0,0 +1,172 @@
+import json
+import math
+import shlex
+import sys
+
+from node import Node
+from utils import (above_year_average, below_global_average,
+                   tree_above_year_average, tree_below_global_average)
+
+# Comandos de texto: nombre -> campos posicionales
+COMMANDS = {
+    "level_order": [],
+    "search": ["mean"],
+    "iso": ["iso3"],
+    "range": ["lo", "hi"],
+    "insert": ["iso3", "country", "values"],
+    "delete": ["mean", "iso3"],
+    "above_year": ["year"],
+    "below_global": ["year"],
+    "above_mean": ["threshold"],
+}
+
+
+def parse_command(line, commands=COMMANDS):
+    """Convierte una línea en un dict {"op": ..., ...}.
+    Acepta JSON ({"op": "search", "mean": 0.61}) o texto (search 0.61) con los comandos de `commands`."""
+    line = line.strip()
+    if line.startswith("{"):
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("se esperaba un objeto JSON")
+        if not isinstance(request.get("op"), str):
+            raise ValueError('"op" debe ser un texto')
+        return request
+    parts = shlex.split(line)
+    op, args = parts[0], parts[1:]
+    if op not in commands:
+        raise ValueError(f"comando desconocido: {op}")
+    fields = commands[op]
+    if len(args) > len(fields):
+        raise ValueError(f"demasiados argumentos para {op}")
+    request = {"op": op}
+    request.update(zip(fields, args))
+    return request
+
+
+def _year(request):
+    """Año entero del comando; int() truncaría 2000.7 en silencio."""
+    value = request["year"]
+    if isinstance(value, bool):
+        raise ValueError("year debe ser un año entero")
+    number = float(value)
+    if not number.is_integer():
+        raise ValueError(f"year debe ser un año entero: {value}")
+    return int(number)
+
+
+def node_info(node):
+    return {"iso3": node.iso3, "country": node.country, "mean": float(node.mean)}
+
+
+class QueryEngine:
+    """Ejecuta comandos del menú sobre un único árbol en memoria."""
+
+    def __init__(self, tree, root, path="dataset_climate_change.csv"):
+        self.tree = tree
+        self.root = root
+        self.path = path
+
+    def execute(self, request):
+        """Ejecuta un comando y retorna un dict serializable a JSON.
+        Cualquier error queda en la respuesta de ese comando (el lote sigue)."""
+        op = request.get("op")
+        response = {"op": op}
+        if "id" in request:
+            response["id"] = request["id"]
+        handler = getattr(self, f"_op_{op}", None)
+        if handler is None:
+            response["error"] = f"comando desconocido: {op}"
+            return response
+        try:
+            response["result"] = handler(request)
+        except Exception as e:
+            response["error"] = f"{type(e).__name__}: {e}"
+        return response
+
+    def _op_level_order(self, request):
+        return [[iso3, float(mean), lvl] for iso3, mean, lvl in self.tree.level_order(self.root)]
+
+    def _op_search(self, request):
+        mean = round(float(request["mean"]), 2)
+        return [node_info(n) for n in self.tree.search_all(self.root, mean)]
+
+    def _op_iso(self, request):
+        node = self.tree.search_by_iso(self.root, str(request["iso3"]).upper())
+        return node_info(node) if node else None
+
+    def _op_range(self, request):
+        lo, hi = float(request["lo"]), float(request["hi"])
+        return [node_info(n) for n in self.tree.range(self.root, lo, hi)]
+
+    def _op_insert(self, request):
+        values = request["values"]
+        if isinstance(values, str):
+            values = [v.strip() for v in values.split(",") if v.strip() != ""]
+        values = [float(v) for v in values]
+        if not values:
+            raise ValueError("values no puede estar vacío")
+        if not all(math.isfinite(v) for v in values):
+            raise ValueError("values debe contener solo números finitos")
+        node = Node(request.get("country", ""), str(request["iso3"]).upper(), values)
+        self.root = self.tree.insert(self.root, node)
+        return node_info(node)
+
+    def _op_delete(self, request):
+        mean = round(float(request["mean"]), 2)
+        iso3 = request.get("iso3")
+        if iso3:
+            node = self.tree.find(self.root, (mean, str(iso3).upper()))
+            if not node:
+                return []
+            self.root = self.tree.remove_node(node)
+            return [node.iso3]
+        self.root, removed = self.tree.delete_all(self.root, mean)
+        return removed
+
+    def _op_above_year(self, request):
+        year = _year(request)
+        if self.tree.aggregates is not None:
+            avg, isos = tree_above_year_average(self.tree, self.root, year, self.path)
+        else:
+            avg, isos = above_year_average(year, self.path)
+        return {"average": None if avg is None else float(avg), "iso3": isos}
+
+    def _op_below_global(self, request):
+        year = _year(request)
+        if self.tree.aggregates is not None:
+            avg, isos = tree_below_global_average(self.tree, self.root, year, self.path)
+        else:
+            avg, isos = below_global_average(year, self.path)
+        return {"average": None if avg is None else float(avg), "iso3": isos}
+
+    def _op_above_mean(self, request):
+        threshold = float(request["threshold"])
+        # Medias redondeadas del árbol; los países sin datos (clave inf) no entran
+        return [n.iso3 for n in self.tree.range(self.root, threshold, sys.float_info.max)]
+
+
+def run_batch(engine, lines, out, flush_every=1):
+    """Lee comandos línea a línea y escribe un resultado JSON por línea a medida que se producen.
+    Por defecto cada resultado se vuelca enseguida (quien escribe puede esperar cada respuesta);
+    con un archivo de entrada conviene agrupar con flush_every > 1.
+    Las líneas vacías o que empiezan con # se ignoran."""
+    count = 0
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        try:
+            request = parse_command(line)
+        except ValueError as e:
+            response = {"line": lineno, "error": str(e)}
+        except Exception as e:
+            # p. ej. RecursionError con JSON muy anidado
+            response = {"line": lineno, "error": f"{type(e).__name__}: {e}"}
+        else:
+            response = engine.execute(request)
+        out.write(json.dumps(response, ensure_ascii=False) + "\n")
+        count += 1
+        if count % flush_every == 0:
+            out.flush()
+    out.flush()
+    return count
@@ -0,0 +1,248 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from avl_tree import AVLTree
+from dataset import YEAR_COLUMNS
+from node import Node
+from utils import above_mean, above_year_average, below_global_average
+
+
+# -----------------------
+# Datos sintéticos
+# -----------------------
+def generate_matrix(n, years=62, nan_rate=0.0, dup_rate=0.0, seed=0):
+    """Matriz n x 62 (F1961..F2022) con `years` años con datos (el resto NaN),
+    una fracción nan_rate de huecos y una fracción dup_rate de filas con la media de otra."""
+    rng = np.random.default_rng(seed)
+    span = min(years, len(YEAR_COLUMNS))
+    target = np.round(rng.normal(0.5, 0.4, n), 2)
+    if dup_rate > 0 and n > 1:
+        dups = rng.random(n) < dup_rate
+        target[dups] = target[rng.integers(0, n, dups.sum())]
+
+    # Ruido centrado para que la media de cada fila sea exactamente target
+    noise = rng.normal(0, 0.5, (n, span))
+    noise -= noise.mean(axis=1, keepdims=True)
+    matrix = np.full((n, len(YEAR_COLUMNS)), np.nan)
+    matrix[:, :span] = noise + target[:, None]
+    if nan_rate > 0:
+        holes = rng.random((n, span)) < nan_rate
+        holes[:, 0] = False  # cada fila conserva al menos un dato
+        matrix[:, :span][holes] = np.nan
+    iso3 = [f"X{i:06d}" for i in range(n)]
+    country = [f"Country {i}" for i in range(n)]
+    return iso3, country, matrix
+
+
+def write_csv(path, iso3, country, matrix):
+    """Escribe los datos con el mismo formato que dataset_climate_change.csv."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ObjectId", "Country", "ISO3"] + YEAR_COLUMNS)
+        for i, row in enumerate(matrix.tolist()):
+            writer.writerow([i + 1, country[i], iso3[i]] + ["" if v != v else f"{v:.3f}" for v in row])
+
+
+def make_nodes(iso3, country, matrix):
+    with np.errstate(invalid="ignore"):
+        means = np.nanmean(matrix, axis=1).tolist()
+    return [Node(c, i, row, round(m, 2)) for i, c, row, m in zip(iso3, country, matrix, means)]
+
+
+# -----------------------
+# Medición
+# -----------------------
+def measure(name, n, calls, setup=None):
+    """Ejecuta cada llamada midiendo su latencia y, en una segunda pasada corta,
+    el pico de memoria con tracemalloc. `setup` reconstruye el estado si la operación lo modifica."""
+    state = setup() if setup else None
+    latencies = []
+    for call in calls:
+        start = time.perf_counter_ns()
+        call(state)
+        latencies.append(time.perf_counter_ns() - start)
+
+    state = setup() if setup else None
+    sample = calls[:100]
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    for call in sample:
+        call(state)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    lat = np.array(latencies) / 1000.0
+    total = lat.sum() / 1e6
+    return {
+        "op": name,
+        "n": n,
+        "calls": len(calls),
+        "ops_per_sec": len(calls) / total if total else float("inf"),
+        "p50_us": float(np.percentile(lat, 50)),
+        "p95_us": float(np.percentile(lat, 95)),
+        "p99_us": float(np.percentile(lat, 99)),
+        "peak_kib": peak / 1024,
+    }
+
+
+class TreeState:
+    def __init__(self, nodes):
+        self.tree = AVLTree()
+        self.root = self.tree.bulk_load(nodes)
+
+
+def bench_size(n, ops, years, nan_rate, dup_rate, seed, workdir):
+    rnd = random.Random(seed)
+    iso3, country, matrix = generate_matrix(n, years, nan_rate, dup_rate, seed)
+    results = []
+    k = min(ops, n)
+
+    # insert: árbol con n - k nodos y k inserciones
+    def setup_insert():
+        nodes = make_nodes(iso3, country, matrix)
+        state = TreeState(nodes[:n - k])
+        state.pending = iter(nodes[n - k:])
+        return state
+
+    def do_insert(state):
+        state.root = state.tree.insert(state.root, next(state.pending))
+    results.append(measure("insert", n, [do_insert] * k, setup_insert))
+
+    def setup_tree():
+        return TreeState(make_nodes(iso3, country, matrix))
+    probe = setup_tree()
+    keys = [node.key for node in rnd.sample(list(probe.tree.inorder(probe.root)), k)]
+
+    def setup_delete():
+        state = setup_tree()
+        state.keys = iter(keys)
+        return state
+
+    def do_delete(state):
+        state.root = state.tree.delete_one_by_key(state.root, next(state.keys))
+    results.append(measure("delete_one_by_key", n, [do_delete] * k, setup_delete))
+
+    means = [key[0] for key in keys]
+    results.append(measure("search_all", n,
+                           [lambda s, m=m: s.tree.search_all(s.root, m) for m in means], setup_tree))
+    isos = [key[1] for key in keys]
+    results.append(measure("search_by_iso", n,
+                           [lambda s, i=i: s.tree.search_by_iso(s.root, i) for i in isos], setup_tree))
+    results.append(measure("level_order", n,
+                           [lambda s: s.tree.level_order(s.root)] * max(1, min(k, 20)), setup_tree))
+
+    # Consultas de utils sobre un CSV sintético (la primera llamada carga el dataset)
+    path = os.path.join(workdir, f"bench_{n}.csv")
+    write_csv(path, iso3, country, matrix)
+    above_year_average(1961, path)
+    span_years = range(1961, 1961 + min(years, len(YEAR_COLUMNS)))
+    years_sample = [rnd.choice(span_years) for _ in range(k)]
+    results.append(measure("above_year_average", n,
+                           [lambda s, y=y: above_year_average(y, path) for y in years_sample]))
+    results.append(measure("below_global_average", n,
+                           [lambda s, y=y: below_global_average(y, path) for y in years_sample]))
+    results.append(measure("above_mean", n,
+                           [lambda s, m=m: above_mean(m, path) for m in means]))
+    os.remove(path)
+    return results
+
+
+# -----------------------
+# Guardar / comparar
+# -----------------------
+# Parámetros que definen la carga medida: con valores distintos las latencias no son comparables
+WORKLOAD_PARAMS = ("ops", "years", "nan_rate", "dup_rate", "seed")
+
+
+def compare(current, baseline, tolerance):
+    """Imprime la variación de la latencia p50 respecto a baseline (menos sensible al ruido
+    que el promedio). Retorna la cantidad de regresiones.
+    ValueError si baseline se midió con otra carga (--ops, --years, --nan-rate, --dup-rate, --seed)."""
+    params = current.get("meta", {}).get("params", {})
+    previous = baseline.get("meta", {}).get("params", {})
+    differ = [f"--{k.replace('_', '-')} {previous.get(k)} -> {params.get(k)}"
+              for k in WORKLOAD_PARAMS if params.get(k) != previous.get(k)]
+    if differ:
+        raise ValueError("parámetros distintos a los de la base: " + ", ".join(differ))
+    old = {(r["op"], r["n"]): r for r in baseline["results"]}
+    regressions = 0
+    for r in current["results"]:
+        prev = old.get((r["op"], r["n"]))
+        if not prev:
+            continue
+        change = r["p50_us"] / prev["p50_us"] - 1 if prev["p50_us"] else 0.0
+        flag = ""
+        if change > tolerance:
+            flag = "  <-- REGRESIÓN"
+            regressions += 1
+        print(f"{r['op']:<22} n={r['n']:<8} p50 {prev['p50_us']:>10.2f} -> {r['p50_us']:>10.2f} µs "
+              f"({change:+.1%}){flag}")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'operación':<22} {'n':>8} {'ops/s':>12} {'p50 µs':>10} {'p95 µs':>10} {'p99 µs':>10} {'pico KiB':>10}")
+    for r in results:
+        print(f"{r['op']:<22} {r['n']:>8} {r['ops_per_sec']:>12.1f} {r['p50_us']:>10.2f} "
+              f"{r['p95_us']:>10.2f} {r['p99_us']:>10.2f} {r['peak_kib']:>10.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de AVLTree y de las consultas de utils")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="cantidades de países a generar (p. ej. 100 ... 1000000)")
+    parser.add_argument("--ops", type=int, default=1000, help="operaciones medidas por tipo y tamaño")
+    parser.add_argument("--years", type=int, default=62, help="años con datos (desde 1961)")
+    parser.add_argument("--nan-rate", type=float, default=0.0, help="fracción de valores faltantes")
+    parser.add_argument("--dup-rate", type=float, default=0.1, help="fracción de países con media repetida")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="JSON", help="guarda los resultados")
+    parser.add_argument("--compare", metavar="JSON", help="compara con resultados guardados")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="aumento de la latencia p50 tolerado antes de marcar regresión (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            results.extend(bench_size(n, args.ops, args.years, args.nan_rate, args.dup_rate, args.seed, workdir))
+    print_table(results)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "params": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        try:
+            regressions = compare(report, baseline, args.tolerance)
+        except ValueError as e:
+            print(f"No se compara: {e}", file=sys.stderr)
+            return 2
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """Lock lectores/escritor: muchos lectores a la vez o un único escritor.
+    Da prioridad a los escritores que esperan para que no queden postergados."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class ConcurrentTree:
+    """Árbol AVL + raíz compartidos entre hilos.
+    Las consultas corren en paralelo bajo el lock de lectura; insert/delete toman el de escritura.
+    Los resultados se materializan dentro del lock (listas, no generadores). Los campos de datos de
+    un nodo (country, iso3, values, mean) no cambian después de insertarlo, así que los nodos
+    devueltos se pueden leer sin lock; sus punteros left/right/parent sí pueden cambiar."""
+
+    def __init__(self, tree, root):
+        self.tree = tree
+        self.root = root
+        self.lock = RWLock()
+
+    # -----------------------
+    # Lecturas
+    # -----------------------
+    def search_all(self, mean, tol=1e-9):
+        with self.lock.read():
+            return self.tree.search_all(self.root, mean, tol)
+
+    def search_by_iso(self, iso3):
+        with self.lock.read():
+            return self.tree.search_by_iso(self.root, iso3)
+
+    def range(self, lo, hi):
+        with self.lock.read():
+            return list(self.tree.range(self.root, lo, hi))
+
+    def level_order(self):
+        with self.lock.read():
+            return self.tree.level_order(self.root)
+
+    def rank(self, mean, inclusive=False):
+        with self.lock.read():
+            return self.tree.rank(self.root, mean, inclusive)
+
+    def select(self, k):
+        with self.lock.read():
+            return self.tree.select(self.root, k)
+
+    def count_range(self, lo, hi):
+        with self.lock.read():
+            return self.tree.count_range(self.root, lo, hi)
+
+    def percentile(self, p):
+        with self.lock.read():
+            return self.tree.percentile(self.root, p)
+
+    # -----------------------
+    # Escrituras
+    # -----------------------
+    def insert(self, node):
+        with self.lock.write():
+            self.root = self.tree.insert(self.root, node)
+
+    def delete_one_by_key(self, key):
+        with self.lock.write():
+            self.root = self.tree.delete_one_by_key(self.root, key)
+
+    def delete_all(self, mean, tol=1e-9):
+        with self.lock.write():
+            self.root, removed = self.tree.delete_all(self.root, mean, tol)
+            return removed
+
+    def delete_range(self, lo, hi):
+        with self.lock.write():
+            self.root, removed = self.tree.delete_range(self.root, lo, hi)
+            return removed
+
+    def delete_keys(self, keys):
+        with self.lock.write():
+            self.root, removed = self.tree.delete_keys(self.root, keys)
+            return removed
@@ -0,0 +1,108 @@
+import cProfile
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Operaciones públicas de AVLTree que se cronometran cuando las estadísticas están activas
+TIMED_OPERATIONS = (
+    "insert", "delete_one_by_key", "delete_all", "delete_range", "delete_keys",
+    "search_all", "search_by_iso", "level_order", "bulk_load",
+    "rank", "select", "count_range", "percentile",
+)
+
+
+class TreeStats:
+    """Contadores de actividad del árbol. Solo existen (y cuestan) si se activan.
+    Los record_* toman un lock: varios hilos lectores pueden actualizar los contadores a la vez."""
+
+    def __init__(self, hook=None):
+        # hook(op, segundos) opcional, se llama después de cada operación cronometrada
+        self.hook = hook
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.rotations = {"single": 0, "double": 0}
+            self.descents = 0
+            self.nodes_visited = 0
+            self.comparisons = 0
+            self.max_depth = 0
+            self.operations = {}
+            # Profundidad de operaciones en curso, por hilo (lectores concurrentes)
+            self._local = threading.local()
+
+    def record_descent(self, visited, comparisons, depth=None):
+        """Un recorrido desde la raíz (búsqueda, inserción, rank...). depth = largo del camino."""
+        depth = visited if depth is None else depth
+        with self._lock:
+            self.descents += 1
+            self.nodes_visited += visited
+            self.comparisons += comparisons
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+    def record_rotation(self, double):
+        with self._lock:
+            self.rotations["double" if double else "single"] += 1
+
+    def record_operation(self, op, seconds):
+        with self._lock:
+            entry = self.operations.get(op)
+            if entry is None:
+                entry = self.operations[op] = {"count": 0, "total_s": 0.0, "max_s": 0.0}
+            entry["count"] += 1
+            entry["total_s"] += seconds
+            if seconds > entry["max_s"]:
+                entry["max_s"] = seconds
+        # El hook corre fuera del lock (puede ser lento o volver a registrar)
+        if self.hook:
+            self.hook(op, seconds)
+
+    def snapshot(self):
+        """Copia consistente de los contadores con promedios derivados."""
+        with self._lock:
+            operations = {
+                op: dict(e, mean_s=e["total_s"] / e["count"]) for op, e in self.operations.items()
+            }
+            return {
+                "rotations": dict(self.rotations),
+                "descents": self.descents,
+                "nodes_visited": self.nodes_visited,
+                "comparisons": self.comparisons,
+                "avg_visited": self.nodes_visited / self.descents if self.descents else 0.0,
+                "max_depth": self.max_depth,
+                "operations": operations,
+            }
+
+
+def timed(stats, name, method):
+    """Envuelve un método para medir su tiempo. Las llamadas anidadas no se cuentan dos veces."""
+    def wrapper(*args, **kwargs):
+        local = stats._local
+        if getattr(local, "active", False):
+            return method(*args, **kwargs)
+        local.active = True
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            local.active = False
+            stats.record_operation(name, time.perf_counter() - start)
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+@contextmanager
+def profile(sort="cumulative", limit=20, stream=None):
+    """Perfila el bloque con cProfile e imprime las `limit` funciones más costosas."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        pstats.Stats(profiler, stream=stream or sys.stdout).sort_stats(sort).print_stats(limit)
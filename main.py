@@ -1,32 +1,50 @@
-from utils import load_data, above_year_average, below_global_average, above_mean
-from avl_tree import AVLTree
+import argparse
+import sys
+
+from batch import QueryEngine, run_batch
+from snapshot import load_or_build
+from utils import tree_above_year_average, tree_below_global_average
 from node import Node
-from visualizer import draw_tree
+from visualizer import TreeRenderer, focus_to_dot, render_dot
 
 # Función auxiliar para recolectar métricas de medias en el árbol
 def collect_means_map(tree, root):
     """Devuelve un diccionario con la cantidad de nodos por cada media encontrada"""
     m = {}
-    for n in tree.get_all_nodes(root):
+    for n in tree.inorder(root):
         m[n.mean] = m.get(n.mean, 0) + 1
     return m
 
 
 # Programa principal
 if __name__ == "__main__":
-    # Carga inicial de datos desde el CSV
-    countries = load_data()
+    parser = argparse.ArgumentParser(description="Árbol AVL de países por temperatura media")
+    parser.add_argument("--batch", metavar="ARCHIVO",
+                        help="ejecuta los comandos de ARCHIVO ('-' = stdin) y escribe un resultado JSON por línea")
+    args = parser.parse_args()
+
+    # Carga inicial: snapshot binario si sigue vigente, si no CSV + construcción en bloque
+    tree, root = load_or_build()
+    # Promedios por año/global del árbol vivo: se actualizan en cada inserción/eliminación
+    tree.enable_aggregates(root, source="dataset_climate_change.csv")
+
+    # Modo no interactivo: sin menú ni render
+    if args.batch:
+        engine = QueryEngine(tree, root)
+        if args.batch == "-":
+            run_batch(engine, sys.stdin, sys.stdout)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                # Entrada completa en un archivo: se agrupan las escrituras
+                run_batch(engine, f, sys.stdout, flush_every=100)
+        sys.exit(0)
 
-    # Se crea el árbol AVL vacío
-    tree = AVLTree()
-    root = None
+    # Contadores de rotaciones/visitas para la vista de salud del árbol (solo en el menú)
+    tree.enable_stats()
 
-    # Construcción del árbol con los países
-    for country, iso3, values in countries:
-        node = Node(country, iso3, values)
-        root = tree.insert(root, node)
-        if root:
-            root.parent = None  # se asegura que la raíz no tenga padre
+    # Render del PNG en segundo plano (agrupa cambios seguidos).
+    # Solo se dibujan los primeros niveles; lo más profundo queda resumido.
+    renderer = TreeRenderer("avl_tree", max_depth=10)
 
     # Menú interactivo
     while True:
@@ -72,6 +90,12 @@ if __name__ == "__main__":
                         print("Abuelo:", g.iso3 if g else None)
                         u = tree.get_uncle(node)
                         print("Tío:", u.iso3 if u else None)
+
+                        h = tree.health(root)
+                        st = tree.stats.snapshot()
+                        print(f"Salud del árbol: altura {h['height']} (mínima posible {h['min_height']}), "
+                              f"rotaciones simples={st['rotations']['single']} dobles={st['rotations']['double']}, "
+                              f"nodos visitados por búsqueda={st['avg_visited']:.1f}")
                     else:
                         print("⚠️ Selección inválida.")
                 else:
@@ -84,18 +108,19 @@ if __name__ == "__main__":
             try:
                 country = input("Ingrese nombre del país: ")
                 iso3 = input("Ingrese código ISO3: ").upper()
+                if tree.search_by_iso(root, iso3):
+                    print(f"⚠️ Ya existe un país con ISO3 {iso3}.")
+                    continue
                 values_input = input("Ingrese valores separados por comas (ej: 1.2,2.3,3.4): ").strip()
                 values = list(map(float, [v.strip() for v in values_input.split(",") if v.strip() != ""]))
 
                 # Crear e insertar nodo
                 node = Node(country, iso3, values)
                 root = tree.insert(root, node)
-                if root:
-                    root.parent = None
 
                 print(f"✅ Nodo {iso3} insertado con media {node.mean:.2f}")
-                draw_tree(root, "avl_tree")
-                print("Árbol actualizado y exportado a avl_tree.png")
+                renderer.update(root)
+                print("Árbol actualizado; avl_tree.png se regenera en segundo plano")
             except ValueError:
                 print("❌ Valores inválidos. Asegúrese de ingresar números separados por comas.")
 
@@ -118,15 +143,13 @@ if __name__ == "__main__":
 
                         deleted_iso = node_to_delete.iso3
                         deleted_country = node_to_delete.country
-                        key = (node_to_delete.mean, node_to_delete.iso3)
+                        key = node_to_delete.key
 
                         root = tree.delete_one_by_key(root, key)
-                        if root:
-                            root.parent = None
 
                         print(f"🗑 Nodo eliminado: {deleted_iso} ({deleted_country})")
-                        draw_tree(root, "avl_tree")
-                        print("✅ Árbol actualizado y exportado a avl_tree.png")
+                        renderer.update(root)
+                        print("✅ Árbol actualizado; avl_tree.png se regenera en segundo plano")
                     else:
                         print("⚠️ Selección inválida.")
             except ValueError:
@@ -136,7 +159,7 @@ if __name__ == "__main__":
         elif opcion == "5":
             try:
                 year = int(input("Ingrese año: "))
-                avg, resultados = above_year_average(year)
+                avg, resultados = tree_above_year_average(tree, root, year)
 
                 if avg is None:
                     print("Año fuera de rango (1961-2022).")
@@ -187,7 +210,7 @@ if __name__ == "__main__":
         elif opcion == "6":
             try:
                 year = int(input("Ingrese año: "))
-                global_avg, resultados = below_global_average(year)
+                global_avg, resultados = tree_below_global_average(tree, root, year)
 
                 if global_avg is None:
                     print("Año fuera de rango (1961-2022).")
@@ -237,7 +260,9 @@ if __name__ == "__main__":
         elif opcion == "7":
             try:
                 th = float(input("Ingrese valor mínimo de media: "))
-                resultados = above_mean(th)
+                # Se responde desde el árbol en orden de media, con la media redondeada de cada nodo
+                # (como la búsqueda); hasta el mayor float: los países sin datos tienen clave inf
+                resultados = [n.iso3 for n in tree.range(root, th, sys.float_info.max)]
 
                 if not resultados:
                     print("No hay países en el resultado.")
@@ -272,11 +297,22 @@ if __name__ == "__main__":
 
         # 8. Mostrar árbol gráfico en PNG
         elif opcion == "8":
-            draw_tree(root, "avl_tree")
-            print("Árbol exportado a avl_tree.png")
+            iso = input("ISO3 a enfocar (Enter = árbol completo): ").strip().upper()
+            if iso:
+                node = tree.search_by_iso(root, iso)
+                if node:
+                    render_dot(focus_to_dot(node), "avl_focus")
+                    print(f"Vecindario de {iso} exportado a avl_focus.png")
+                else:
+                    print("El país no está en el árbol.")
+            else:
+                renderer.update(root)
+                renderer.flush()
+                print("Árbol exportado a avl_tree.png")
 
         # 0. Salir del programa
         elif opcion == "0":
+            renderer.close()
             break
 
         else:
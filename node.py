@@ -1,15 +1,24 @@
 # node.py
 class Node:
-    def __init__(self, country, iso3, values):
+    # Sin __dict__ por instancia: solo estos atributos
+    __slots__ = ("country", "iso3", "values", "mean", "key", "height", "size", "left", "right", "parent")
+
+    def __init__(self, country, iso3, values, mean=None):
         self.country = country
         self.iso3 = iso3
-        self.values = values  # lista F1961..F2022
+        self.values = values  # F1961..F2022 (lista o fila/vista de la matriz compartida)
 
         # Redondeamos la media a 2 decimales para que búsquedas exactas funcionen.
-        self.mean = round(sum(values) / len(values), 2)
+        # Si la carga masiva ya la calculó, se usa directamente.
+        if mean is None:
+            mean = round(sum(values) / len(values), 2)
+        self.mean = mean
+        # Clave de orden (valor, iso3); la calcula el árbol al insertar el nodo
+        self.key = None
 
         # Propiedades AVL
         self.height = 1
+        self.size = 1  # cantidad de nodos del subárbol
         self.left = None
         self.right = None
         self.parent = None
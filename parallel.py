@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from stats import RunningStats
+
+# Con menos filas por proceso el costo del pool supera la ganancia
+MIN_ROWS_PER_WORKER = 100000
+
+
+def _aggregate_block(block):
+    """Parciales de un bloque: RunningStats por año + suma y cantidad por fila."""
+    stats = RunningStats(block.shape[1])
+    stats.add_rows(block)
+    return stats, np.nansum(block, axis=1), np.count_nonzero(~np.isnan(block), axis=1)
+
+
+def _worker(matrix_name, out_name, shape, start, stop):
+    # El padre es el dueño de los bloques: el hijo solo cierra su vista, no hace unlink
+    matrix_shm = shared_memory.SharedMemory(name=matrix_name)
+    out_shm = shared_memory.SharedMemory(name=out_name)
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=matrix_shm.buf)
+        out = np.ndarray((2, shape[0]), dtype=np.float64, buffer=out_shm.buf)
+        stats, sums, counts = _aggregate_block(matrix[start:stop])
+        # Los resultados por fila se escriben directo en memoria compartida
+        out[0, start:stop] = sums
+        out[1, start:stop] = counts
+        del matrix, out
+        return stats
+    finally:
+        matrix_shm.close()
+        out_shm.close()
+
+
+def aggregate(matrix, workers=None):
+    """Agrega la matriz (países x años) repartiendo las filas entre procesos.
+    Retorna (RunningStats por año, suma por país, cantidad de valores por país).
+    Para matrices chicas se calcula en el proceso actual."""
+    matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+    n = matrix.shape[0]
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, n // MIN_ROWS_PER_WORKER)
+    if workers <= 1:
+        return _aggregate_block(matrix)
+
+    matrix_shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    out_shm = shared_memory.SharedMemory(create=True, size=2 * n * 8)
+    try:
+        shared = np.ndarray(matrix.shape, dtype=np.float64, buffer=matrix_shm.buf)
+        shared[:] = matrix
+        bounds = np.linspace(0, n, workers + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_worker, matrix_shm.name, out_shm.name, matrix.shape, a, b)
+                       for a, b in zip(bounds[:-1], bounds[1:])]
+            stats = RunningStats(matrix.shape[1])
+            for future in futures:
+                stats.merge(future.result())
+        out = np.ndarray((2, n), dtype=np.float64, buffer=out_shm.buf)
+        sums, counts = out[0].copy(), out[1].astype(np.int64)
+        del shared, out
+        return stats, sums, counts
+    finally:
+        matrix_shm.close()
+        matrix_shm.unlink()
+        out_shm.close()
+        out_shm.unlink()
@@ -0,0 +1,324 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from batch import COMMANDS, QueryEngine, parse_command
+from dataset import cached_dataset, get_dataset
+from snapshot import load_or_build
+from visualizer import render_dot, tree_to_dot
+
+# Comandos de texto propios del servidor, además de los de batch
+SERVICE_COMMANDS = dict(COMMANDS, render=[], reload=[])
+# Comandos que usan el dataset. Sin tree.enable_aggregates corren enteros en el pool;
+# con agregados corren en el loop, pero si el CSV no está cargado (o cambió) se lee antes en el pool.
+EXECUTOR_OPS = {"above_year", "below_global"}
+LINE_LIMIT = 1 << 20  # largo máximo de una línea de comando
+PIPELINE_DEPTH = 256  # comandos en vuelo por conexión antes de dejar de leer
+
+
+def _header(request):
+    response = {"op": request.get("op")}
+    if "id" in request:
+        response["id"] = request["id"]
+    return response
+
+
+def _error(request, error):
+    response = _header(request)
+    response["error"] = f"{type(error).__name__}: {error}"
+    return response
+
+
+def _response(request, fn, *args):
+    try:
+        result = fn(*args)
+    except Exception as e:
+        return _error(request, e)
+    response = _header(request)
+    response["result"] = result
+    return response
+
+
+class QueryService:
+    """Servidor asyncio: un comando por línea (JSON o texto, como en --batch) y una respuesta JSON por línea.
+    Las operaciones del árbol corren en el event loop, en orden de llegada (son O(log n));
+    la lectura del CSV, la recarga y el render van a un pool de hilos.
+    Una conexión puede enviar muchos comandos sin esperar (pipelining): las respuestas salen en el mismo orden.
+    Comandos extra: render (DOT + PNG del árbol) y reload (reconstruye el árbol desde el CSV)."""
+
+    def __init__(self, engine, workers=4, render_file="avl_tree", max_depth=10):
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(workers)
+        self.render_file = render_file
+        self.max_depth = max_depth
+        self.requests = 0
+
+    async def start(self, host="127.0.0.1", port=8765, unix=None):
+        if unix:
+            return await asyncio.start_unix_server(self._handle, unix, limit=LINE_LIMIT)
+        return await asyncio.start_server(self._handle, host, port, limit=LINE_LIMIT)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    async def _handle(self, reader, writer):
+        pending = asyncio.Queue(PIPELINE_DEPTH)
+        sender = asyncio.create_task(self._send(pending, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    # Línea demasiado larga o conexión cortada
+                    break
+                if not line:
+                    break
+                text = line.decode("utf-8", "replace")
+                if not text.strip() or text.lstrip().startswith("#"):
+                    continue
+                await pending.put(await self._dispatch(text))
+        finally:
+            await pending.put(None)
+            await sender
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _send(self, pending, writer):
+        """Escribe las respuestas en orden; si el cliente se fue, sigue vaciando la cola."""
+        broken = False
+        while True:
+            future = await pending.get()
+            if future is None:
+                return
+            response = await future
+            if broken:
+                continue
+            try:
+                writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                broken = True
+
+    async def _dispatch(self, line):
+        """Ejecuta o programa un comando. Retorna un future con la respuesta.
+        Cualquier error (también al interpretar la línea) queda como respuesta de ese comando."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await self._dispatch_request(loop, line)
+        except Exception as e:
+            future = loop.create_future()
+            future.set_result({"error": f"{type(e).__name__}: {e}"})
+            return future
+
+    async def _dispatch_request(self, loop, line):
+        future = loop.create_future()
+        try:
+            request = parse_command(line, SERVICE_COMMANDS)
+        except ValueError as e:
+            future.set_result({"error": str(e)})
+            return future
+        self.requests += 1
+        op = request.get("op")
+
+        if op in EXECUTOR_OPS:
+            if self.engine.tree.aggregates is None:
+                return loop.run_in_executor(self.executor, self._execute, request)
+            await self._load_dataset(loop)
+        if op == "render":
+            # El DOT se arma acá (lee el árbol); la rasterización, en un hilo
+            dot = tree_to_dot(self.engine.root, self.max_depth)
+            return loop.run_in_executor(self.executor, _response, request, self._render, dot)
+        if op == "reload":
+            # Se espera antes de leer el próximo comando: los siguientes ya ven el árbol nuevo
+            response = await loop.run_in_executor(self.executor, _response, request,
+                                                  load_or_build, self.engine.path)
+            loaded = response.pop("result", None)
+            if loaded:
+                live = self.engine.tree.aggregates is not None
+                self.engine.tree, self.engine.root = loaded
+                if live:
+                    self.engine.tree.enable_aggregates(self.engine.root, source=self.engine.path)
+                response["result"] = {"size": self.engine.root.size if self.engine.root else 0}
+            future.set_result(response)
+            return future
+        future.set_result(self._execute(request))
+        return future
+
+    async def _load_dataset(self, loop):
+        """Lee el CSV en el pool si la consulta lo va a necesitar y no está al día en la caché."""
+        agg = self.engine.tree.aggregates
+        if not agg.tracking or cached_dataset(self.engine.path) is not None:
+            return
+        try:
+            await loop.run_in_executor(self.executor, get_dataset, self.engine.path)
+        except Exception:
+            # El error se reporta al ejecutar el comando
+            pass
+
+    def _execute(self, request):
+        """engine.execute con un catch-all: un error no previsto queda como respuesta
+        de este comando y la conexión sigue abierta."""
+        try:
+            return self.engine.execute(request)
+        except Exception as e:
+            return _error(request, e)
+
+    def _render(self, dot):
+        render_dot(dot, self.render_file)
+        return f"{self.render_file}.png"
+
+
+async def serve(csv_path, host="127.0.0.1", port=8765, unix=None, workers=4):
+    tree, root = load_or_build(csv_path)
+    # Como en main.py: los promedios reflejan las inserciones/eliminaciones del árbol
+    tree.enable_aggregates(root, source=csv_path)
+    service = QueryService(QueryEngine(tree, root, csv_path), workers)
+    # El dataset se carga en el pool antes de aceptar conexiones, no en la primera consulta
+    await asyncio.get_running_loop().run_in_executor(service.executor, get_dataset, csv_path)
+    server = await service.start(host, port, unix)
+    print(f"Escuchando en {unix or f'{host}:{port}'}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+# -----------------------
+# Cliente
+# -----------------------
+async def open_client(host="127.0.0.1", port=8765, unix=None):
+    if unix:
+        return await asyncio.open_unix_connection(unix, limit=LINE_LIMIT)
+    return await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+
+
+def _encode(request):
+    line = json.dumps(request, ensure_ascii=False) if isinstance(request, dict) else request.strip()
+    return line.encode("utf-8") + b"\n"
+
+
+async def query(requests, host="127.0.0.1", port=8765, unix=None):
+    """Envía los comandos de una vez (pipelining) y retorna las respuestas en orden.
+    Cada comando es un dict o una línea de texto no vacía."""
+    reader, writer = await open_client(host, port, unix)
+    try:
+        for request in requests:
+            writer.write(_encode(request))
+        await writer.drain()
+        return [json.loads(await reader.readline()) for _ in requests]
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+# -----------------------
+# Generador de carga
+# -----------------------
+def random_request(rnd, isos):
+    """Mezcla de consultas de solo lectura."""
+    kind = rnd.random()
+    if kind < 0.4:
+        return {"op": "search", "mean": round(rnd.uniform(-0.5, 2.5), 2)}
+    if kind < 0.7:
+        return {"op": "iso", "iso3": rnd.choice(isos)}
+    if kind < 0.9:
+        lo = round(rnd.uniform(-0.5, 2.5), 2)
+        return {"op": "range", "lo": lo, "hi": lo + 0.05}
+    return {"op": rnd.choice(["above_year", "below_global"]), "year": rnd.randint(1961, 2022)}
+
+
+async def _load_connection(address, requests, depth, latencies):
+    """Una conexión con hasta `depth` comandos en vuelo."""
+    reader, writer = await open_client(*address)
+    window = asyncio.Semaphore(depth)
+    sent = deque()
+
+    async def receive():
+        for _ in requests:
+            await reader.readline()
+            latencies.append(time.perf_counter() - sent.popleft())
+            window.release()
+
+    receiver = asyncio.create_task(receive())
+    for request in requests:
+        await window.acquire()
+        sent.append(time.perf_counter())
+        writer.write(_encode(request))
+        await writer.drain()
+    await receiver
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load_test(connections=50, requests=1000, depth=16, host="127.0.0.1", port=8765, unix=None, seed=0):
+    """Abre `connections` conexiones con `requests` consultas cada una y mide el throughput."""
+    address = (host, port, unix)
+    first = await query([{"op": "level_order"}], *address)
+    isos = [row[0] for row in first[0].get("result") or []] or ["ARG"]
+    rnd = random.Random(seed)
+    batches = [[random_request(rnd, isos) for _ in range(requests)] for _ in range(connections)]
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_load_connection(address, batch, depth, latencies) for batch in batches))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "connections": connections,
+        "requests": total,
+        "seconds": elapsed,
+        "req_per_sec": total / elapsed if elapsed else float("inf"),
+        "p50_ms": latencies[total // 2] * 1000 if total else 0.0,
+        "p99_ms": latencies[int(total * 0.99) - 1 if total > 1 else 0] * 1000 if total else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de consultas del árbol AVL (JSON por línea)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="RUTA", help="socket Unix en lugar de TCP")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_serve = sub.add_parser("serve", help="inicia el servidor")
+    p_serve.add_argument("--csv", default="dataset_climate_change.csv")
+    p_serve.add_argument("--workers", type=int, default=4, help="hilos para CSV y render")
+
+    p_query = sub.add_parser("query", help="envía comandos y muestra las respuestas")
+    p_query.add_argument("commands", nargs="+", help='p. ej. "search 0.61" o \'{"op": "iso", "iso3": "ARG"}\'')
+
+    p_load = sub.add_parser("load", help="generador de carga")
+    p_load.add_argument("--connections", type=int, default=50)
+    p_load.add_argument("--requests", type=int, default=1000, help="consultas por conexión")
+    p_load.add_argument("--depth", type=int, default=16, help="consultas en vuelo por conexión")
+    p_load.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.csv, args.host, args.port, args.unix, args.workers))
+        except KeyboardInterrupt:
+            pass
+    elif args.command == "query":
+        for response in asyncio.run(query(args.commands, args.host, args.port, args.unix)):
+            print(json.dumps(response, ensure_ascii=False))
+    else:
+        result = asyncio.run(load_test(args.connections, args.requests, args.depth,
+                                       args.host, args.port, args.unix, args.seed))
+        print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from avl_tree import AVLTree, mean_key
+from node import Node
+
+# Formato (little-endian):
+#   cabecera  magic, n, años, mtime_ns y tamaño del CSV origen, índice de raíz, bytes de texto
+#   float64[n]      medias (nodos en orden inorder)
+#   int32[n] x 5    hijo izquierdo, hijo derecho (-1 = ninguno), altura, tamaño, largo de values (-1 = None)
+#   float64[n*años] matriz de values (relleno con NaN)
+#   utf-8           iso3 y país de cada nodo separados por "\0"
+MAGIC = b"AVLSNAP1"
+HEADER = struct.Struct("<8sIIqqiq")
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def default_snapshot_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".avl"
+
+
+def save_tree(tree, root, path, source_csv):
+    """Guarda el árbol (forma, claves, alturas y values) en un archivo binario.
+    Solo árboles ordenados por media: la clave se reconstruye a partir de ella."""
+    if tree.key is not mean_key:
+        raise ValueError("el snapshot solo admite árboles ordenados por media")
+    nodes = list(tree.inorder(root))
+    n = len(nodes)
+    position = {id(node): i for i, node in enumerate(nodes)}
+
+    lengths = [-1 if node.values is None else len(node.values) for node in nodes]
+    years = max([0] + lengths)
+
+    means = np.array([node.mean for node in nodes], dtype="<f8")
+    links = np.array([
+        [position[id(node.left)] if node.left else -1 for node in nodes],
+        [position[id(node.right)] if node.right else -1 for node in nodes],
+        [node.height for node in nodes],
+        [node.size for node in nodes],
+        lengths,
+    ], dtype="<i4").reshape(5 * n)
+    values = np.full((n, years), np.nan, dtype="<f8")
+    for i, node in enumerate(nodes):
+        if lengths[i] > 0:
+            values[i, :lengths[i]] = node.values
+    text = "\0".join(s for node in nodes for s in (node.iso3, node.country)).encode("utf-8")
+
+    st = os.stat(source_csv)
+    header = HEADER.pack(MAGIC, n, years, st.st_mtime_ns, st.st_size,
+                         position[id(root)] if root else -1, len(text))
+    # Temporal único en el mismo directorio: dos procesos guardando a la vez no se pisan
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(b"\0" * (_align(HEADER.size) - HEADER.size))
+            for array in (means, links):
+                f.write(array.tobytes())
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+            f.write(values.tobytes())
+            f.write(text)
+        # Reemplazo atómico: un lector nunca ve un archivo a medio escribir
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _valid_links(left, right, lengths, root_index, years):
+    """Comprueba que los enlaces formen un único árbol cuyo inorder es 0..n-1 (el orden guardado)
+    y que los largos de values entren en la matriz."""
+    n = len(left)
+    if not -1 <= root_index < n or (root_index < 0) != (n == 0):
+        return False
+    if any(not -1 <= length <= years for length in lengths):
+        return False
+    children = [i for i in left + right if i != -1]
+    if any(not 0 <= i < n for i in children):
+        return False
+    # Cada nodo salvo la raíz tiene exactamente un padre: sin ciclos alcanzables desde la raíz
+    if len(children) != max(n - 1, 0) or len(set(children)) != len(children) or root_index in children:
+        return False
+    stack, i, expected = [], root_index, 0
+    while stack or i >= 0:
+        if i >= 0:
+            stack.append(i)
+            i = left[i]
+        else:
+            i = stack.pop()
+            if i != expected:
+                return False
+            expected += 1
+            i = right[i]
+    return expected == n
+
+
+def load_tree(path, source_csv):
+    """Reconstruye (tree, root) en O(n) desde el snapshot (memoria mapeada).
+    Retorna None si no existe, es inválido o el CSV cambió desde que se guardó."""
+    try:
+        st = os.stat(source_csv)
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(buf) < HEADER.size:
+        return None
+    magic, n, years, mtime_ns, size, root_index, text_len = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or mtime_ns != st.st_mtime_ns or size != st.st_size:
+        return None
+    expected = _align(_align(_align(HEADER.size) + 8 * n) + 4 * 5 * n) + 8 * n * years + text_len
+    if len(buf) != expected:
+        return None
+
+    offset = _align(HEADER.size)
+    means = np.frombuffer(buf, dtype="<f8", count=n, offset=offset).tolist()
+    offset = _align(offset + 8 * n)
+    links = np.frombuffer(buf, dtype="<i4", count=5 * n, offset=offset).reshape(5, n)
+    left, right, heights, sizes, lengths = (row.tolist() for row in links)
+    if not _valid_links(left, right, lengths, root_index, years):
+        return None
+    offset = _align(offset + 4 * 5 * n)
+    # Las filas de values son vistas sobre el archivo mapeado (sin copia)
+    values = np.frombuffer(buf, dtype="<f8", count=n * years, offset=offset).reshape(n, years)
+    offset += 8 * n * years
+    try:
+        text = bytes(buf[offset:offset + text_len]).decode("utf-8").split("\0") if n else []
+    except UnicodeDecodeError:
+        return None
+    if len(text) != 2 * n:
+        return None
+
+    tree = AVLTree()
+    nodes = []
+    for i in range(n):
+        row = None if lengths[i] < 0 else values[i, :lengths[i]]
+        node = Node(text[2 * i + 1], text[2 * i], row, means[i])
+        # Igual que al insertar: una media NaN (fila sin datos) queda como inf
+        tree.make_key(node)
+        node.height = heights[i]
+        node.size = sizes[i]
+        nodes.append(node)
+    for i, node in enumerate(nodes):
+        if left[i] >= 0:
+            node.left = nodes[left[i]]
+            node.left.parent = node
+        if right[i] >= 0:
+            node.right = nodes[right[i]]
+            node.right.parent = node
+
+    try:
+        tree.iso_index = tree.build_iso_index(nodes)
+    except ValueError:
+        # ISO3 repetido: el archivo no viene de un árbol válido
+        return None
+    return tree, (nodes[root_index] if root_index >= 0 else None)
+
+
+def load_or_build(csv_path="dataset_climate_change.csv", snapshot_path=None):
+    """Usa el snapshot si sigue vigente; si no, construye desde el CSV y lo guarda."""
+    snapshot_path = snapshot_path or default_snapshot_path(csv_path)
+    loaded = load_tree(snapshot_path, csv_path)
+    if loaded:
+        return loaded
+
+    # Import tardío: con un snapshot vigente no hace falta leer el CSV
+    from utils import build_tree
+    tree, root = build_tree(csv_path)
+    try:
+        save_tree(tree, root, snapshot_path, csv_path)
+    except OSError:
+        pass
+    return tree, root
@@ -0,0 +1,133 @@
+import os
+
+import numpy as np
+
+
+class RunningStats:
+    """Acumuladores por año (suma, cantidad, mín, máx) que se alimentan por bloques de filas."""
+
+    def __init__(self, years=62):  # 62 = F1961..F2022
+        self.sum = np.zeros(years)
+        self.count = np.zeros(years, dtype=np.int64)
+        # fmin/fmax ignoran NaN: quedan NaN mientras el año no tenga datos
+        self.min = np.full(years, np.nan)
+        self.max = np.full(years, np.nan)
+
+    def add_rows(self, block):
+        self.sum += np.nansum(block, axis=0)
+        self.count += np.count_nonzero(~np.isnan(block), axis=0)
+        # initial=NaN: un bloque sin filas (CSV solo con cabecera) no falla
+        self.min = np.fmin(self.min, np.fmin.reduce(block, axis=0, initial=np.nan))
+        self.max = np.fmax(self.max, np.fmax.reduce(block, axis=0, initial=np.nan))
+
+    def merge(self, other):
+        """Suma los acumuladores parciales de otro RunningStats (p. ej. de otro proceso)."""
+        self.sum += other.sum
+        self.count += other.count
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    def year_mean(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sum / self.count
+
+    def global_mean(self):
+        total = self.count.sum()
+        return self.sum.sum() / total if total else float("nan")
+
+
+class LiveAggregates:
+    """Suma, cantidad y suma de cuadrados por año de los nodos presentes en el árbol.
+    Se actualiza en O(años) en cada inserción/eliminación, sin volver a leer el CSV.
+    Los nodos sin values (carga por streaming) no aportan.
+    Si se indica el CSV de origen (track), registra qué ISO3 se agregaron/quitaron respecto
+    de los nodos iniciales, para que las consultas usen los arreglos del dataset y solo revisen los cambios."""
+
+    def __init__(self, years=62):
+        self.years = years
+        self.sum = np.zeros(years)
+        self.count = np.zeros(years, dtype=np.int64)
+        self.sumsq = np.zeros(years)
+        self.added = {}  # ISO3 -> nodo insertado después de la carga inicial
+        self.removed = set()  # ISO3 iniciales que ya no están
+        # True si el árbol es "CSV de origen + cambios registrados" (ver track)
+        self.tracking = False
+        self.source = None
+        self.source_mtime = None
+        self.base_isos = None
+        self.verified = False  # base_isos ya comparado con el dataset
+
+    def track(self, source, isos):
+        """Declara que los nodos iniciales (ISO3 isos) son los del CSV source en su versión actual.
+        Las consultas lo comprueban contra el dataset (ruta, mtime y conjunto de ISO3) antes de usarlo."""
+        try:
+            self.source_mtime = os.stat(source).st_mtime_ns
+        except OSError:
+            return
+        self.source = os.path.abspath(source)
+        self.base_isos = isos
+        self.verified = False
+        self.tracking = True
+
+    def reset(self):
+        """Vacía los acumuladores (el árbol se reconstruyó con otros nodos)."""
+        self.sum[:] = 0.0
+        self.count[:] = 0
+        self.sumsq[:] = 0.0
+        self.added.clear()
+        self.removed.clear()
+        self.tracking = False
+
+    def _row(self, values):
+        # Los values cargados a mano pueden ser más cortos: el resto queda NaN
+        row = np.full(self.years, np.nan)
+        head = np.asarray(values[:self.years], dtype=float)
+        row[:len(head)] = head
+        return row
+
+    def add_rows(self, block, sign=1):
+        present = ~np.isnan(block)
+        block = np.where(present, block, 0.0)
+        self.sum += sign * block.sum(axis=0)
+        self.count += sign * present.sum(axis=0)
+        self.sumsq += sign * (block * block).sum(axis=0)
+
+    def add_nodes(self, nodes):
+        rows = [self._row(node.values) for node in nodes if node.values is not None]
+        if rows:
+            self.add_rows(np.array(rows))
+        return self
+
+    def add(self, node):
+        self.added[node.iso3] = node
+        if node.values is not None:
+            self.add_rows(self._row(node.values)[None, :])
+
+    def remove(self, node):
+        if self.added.pop(node.iso3, None) is None:
+            self.removed.add(node.iso3)
+        if node.values is not None:
+            self.add_rows(self._row(node.values)[None, :], -1)
+
+    def year_mean(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sum / self.count
+
+    def year_std(self):
+        """Desvío estándar poblacional por año (NaN si el año no tiene datos)."""
+        mean = self.year_mean()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # max(0, ...): las restas sucesivas pueden dejar un -epsilon
+            return np.sqrt(np.maximum(self.sumsq / self.count - mean * mean, 0.0))
+
+    def global_mean(self):
+        total = self.count.sum()
+        return self.sum.sum() / total if total else float("nan")
+
+    def global_std(self):
+        total = self.count.sum()
+        if not total:
+            return float("nan")
+        mean = self.sum.sum() / total
+        return float(np.sqrt(max(self.sumsq.sum() / total - mean * mean, 0.0)))
@@ -1,14 +1,51 @@
-import pandas as pd
+import os
+
+from avl_tree import AVLTree, mean_key
+from dataset import get_dataset, iter_records
+from node import Node
 
 def load_data(path="dataset_climate_change.csv"):
     """Carga los datos del CSV y retorna lista de (país, iso3, valores)"""
-    df = pd.read_csv(path)
-    countries = []
-    for _, row in df.iterrows():
-        # Extraer valores de F1961 a F2022
-        values = [row[f"F{year}"] for year in range(1961, 2023)]
-        countries.append((row["Country"], row["ISO3"], values))
-    return countries
+    ds = get_dataset(path)
+    return list(zip(ds.country.tolist(), ds.iso3.tolist(), ds.matrix.tolist()))
+
+
+def load_records(path="dataset_climate_change.csv"):
+    """Igual que load_data pero con la media ya calculada: (país, iso3, valores, media).
+    Los valores son vistas (sin copia) de las filas de la matriz compartida del dataset."""
+    ds = get_dataset(path)
+    # Redondeo a 2 decimales igual que en Node
+    means = [round(m, 2) for m in ds.means.tolist()]
+    return list(zip(ds.country.tolist(), ds.iso3.tolist(), list(ds.matrix), means))
+
+
+def build_tree(path="dataset_climate_change.csv", key=mean_key):
+    """Carga el CSV y construye el árbol AVL en bloque, ordenado por key (la media por defecto).
+    Retorna (tree, root)"""
+    tree = AVLTree(key)
+    nodes = [Node(country, iso3, values, mean) for country, iso3, values, mean in load_records(path)]
+    return tree, tree.bulk_load(nodes)
+
+
+def build_trees(keys, path="dataset_climate_change.csv"):
+    """Un árbol por función de clave ({nombre: key}) sobre los mismos países.
+    Cada árbol tiene sus propios nodos; los values son vistas de la misma matriz (sin copia).
+    Retorna {nombre: (tree, root)}"""
+    records = load_records(path)
+    trees = {}
+    for name, key in keys.items():
+        tree = AVLTree(key)
+        trees[name] = (tree, tree.bulk_load([Node(c, i, v, m) for c, i, v, m in records]))
+    return trees
+
+
+def build_tree_streaming(path="dataset_climate_change.csv", keep_values=False, stats=None, chunk_size=10000):
+    """Construye el árbol leyendo el CSV por bloques, sin cargarlo entero en memoria.
+    Por defecto cada nodo guarda solo la media (values = None). Retorna (tree, root)"""
+    tree = AVLTree()
+    nodes = [Node(country, iso3, values, mean)
+             for country, iso3, values, mean in iter_records(path, chunk_size, keep_values, stats)]
+    return tree, tree.bulk_load(nodes)
 
 
 def above_year_average(year, path="dataset_climate_change.csv"):
@@ -16,14 +53,11 @@ def above_year_average(year, path="dataset_climate_change.csv"):
     if year < 1961 or year > 2022:
         return None, []
 
-    df = pd.read_csv(path)
-    column = f"F{year}"
+    ds = get_dataset(path)
 
-    # Calcular promedio del año (maneja NaN automáticamente)
-    avg = df[column].mean(skipna=True)
-
-    # Retornar promedio + lista de ISO3
-    return avg, df[df[column] > avg]["ISO3"].tolist()
+    # Promedio del año precalculado (ignora NaN) + búsqueda binaria
+    avg = ds.year_mean[year - 1961]
+    return avg, ds.countries_above(year, avg)
 
 
 def below_global_average(year, path="dataset_climate_change.csv"):
@@ -31,29 +65,92 @@ def below_global_average(year, path="dataset_climate_change.csv"):
     if year < 1961 or year > 2022:
         return None, []
 
-    df = pd.read_csv(path)
-    column = f"F{year}"
-
-    # Calcular promedio global de todos los años (1961-2022)
-    all_temp_columns = [f"F{y}" for y in range(1961, 2023)]
-    global_avg = df[all_temp_columns].values.flatten()
-    global_avg = pd.Series(global_avg).mean(skipna=True)
+    ds = get_dataset(path)
 
-    # Retornar promedio global + lista de ISO3
-    return global_avg, df[df[column] < global_avg]["ISO3"].tolist()
+    # Promedio global de todos los años (1961-2022), precalculado al cargar
+    global_avg = ds.global_mean
+    return global_avg, ds.countries_below(year, global_avg)
 
 
 def above_mean(threshold, path="dataset_climate_change.csv"):
-    """Países cuya media de temperatura >= threshold"""
-    df = pd.read_csv(path)
-    result = []
+    """Países cuya media de temperatura >= threshold (media sin redondear, orden del CSV).
+    La opción 7 del menú y above_mean de batch usan en cambio la media redondeada de los nodos."""
+    ds = get_dataset(path)
+
+    # Medias por país precalculadas al cargar el dataset
+    return ds.iso3[ds.means >= threshold].tolist()
+
+
+def _node_value(node, year):
+    """Valor del nodo en el año, o None si no hay dato."""
+    idx = year - 1961
+    if node.values is None or idx >= len(node.values):
+        return None
+    value = node.values[idx]
+    return None if value != value else value
+
+
+def tracked_dataset(agg, path):
+    """Dataset de `path` si el árbol de agg es exactamente ese CSV más los cambios registrados:
+    misma ruta, mismo mtime que al activar los agregados y mismo conjunto inicial de ISO3.
+    None si no (árbol de otro CSV, con cambios previos, o CSV editado después)."""
+    if not agg.tracking or os.path.abspath(path) != agg.source:
+        return None
+    try:
+        if os.stat(path).st_mtime_ns != agg.source_mtime:
+            return None
+    except OSError:
+        return None
+    ds = get_dataset(path)
+    if ds.mtime != agg.source_mtime:
+        return None
+    if not agg.verified:
+        # Una sola vez: compara el conjunto de ISO3 iniciales con el del CSV
+        if agg.base_isos != set(ds.iso3.tolist()):
+            agg.tracking = False
+            return None
+        agg.verified = True
+    return ds
+
+
+def _live_countries(tree, root, year, path, keep, from_dataset):
+    """ISO3 de los nodos del árbol cuyo valor en el año cumple keep(valor).
+    Si el árbol es la carga de `path` más cambios registrados (tracked_dataset), se usa la búsqueda
+    binaria del dataset descartando los eliminados y solo se revisan los insertados: O(log n + k + cambios).
+    Si no, se recorre el árbol entero."""
+    agg = tree.aggregates
+    ds = tracked_dataset(agg, path)
+    if ds is not None:
+        result = [iso for iso in from_dataset(ds) if iso not in agg.removed]
+        candidates = agg.added.values()
+    else:
+        result = []
+        candidates = tree.inorder(root)
+    for node in candidates:
+        value = _node_value(node, year)
+        if value is not None and keep(value):
+            result.append(node.iso3)
+    return result
 
-    temp_columns = [f"F{y}" for y in range(1961, 2023)]
 
-    for _, row in df.iterrows():
-        # Calcular media del país 
-        country_mean = pd.Series([row[col] for col in temp_columns]).mean(skipna=True)
-        if country_mean >= threshold:
-            result.append(row["ISO3"])
+def tree_above_year_average(tree, root, year, path="dataset_climate_change.csv"):
+    """Como above_year_average pero sobre el árbol en memoria (incluye inserciones y eliminaciones). Requiere tree.enable_aggregates: el promedio sale
+    de los agregados en O(62). Los países del CSV salen en su orden y luego los insertados."""
+    if year < 1961 or year > 2022:
+        return None, []
+    if tree.aggregates is None:
+        raise ValueError("se requiere tree.enable_aggregates(root)")
+    avg = tree.aggregates.year_mean()[year - 1961]
+    return avg, _live_countries(tree, root, year, path, lambda v: v > avg,
+                                lambda ds: ds.countries_above(year, avg))
 
-    return result
+
+def tree_below_global_average(tree, root, year, path="dataset_climate_change.csv"):
+    """Como below_global_average pero sobre el árbol en memoria (requiere tree.enable_aggregates)."""
+    if year < 1961 or year > 2022:
+        return None, []
+    if tree.aggregates is None:
+        raise ValueError("se requiere tree.enable_aggregates(root)")
+    global_avg = tree.aggregates.global_mean()
+    return global_avg, _live_countries(tree, root, year, path, lambda v: v < global_avg,
+                                       lambda ds: ds.countries_below(year, global_avg))
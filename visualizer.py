@@ -1,15 +1,189 @@
-from graphviz import Digraph
-
-def draw_tree(root, filename="tree"):
-    dot = Digraph()
-    def add_nodes(node):
-        if not node: return
-        dot.node(node.iso3, f"{node.iso3}\n{round(node.mean,2)}")
-        if node.left:
-            dot.edge(node.iso3, node.left.iso3)
-            add_nodes(node.left)
-        if node.right:
-            dot.edge(node.iso3, node.right.iso3)
-            add_nodes(node.right)
-    add_nodes(root)
-    dot.render(filename, format="png", cleanup=True)
+import threading
+import time
+
+
+def _quote(text):
+    """Cadena DOT entre comillas; los saltos de línea pasan a "\\n" de DOT."""
+    text = str(text).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{text}"'
+
+
+def _node_line(lines, node):
+    name = _quote(node.iso3)
+    # Valor de la clave por la que está ordenado el árbol; la media aparte si es otra clave
+    value = node.key[0]
+    text = f"{node.iso3}\n{round(value, 2)}"
+    if value != node.mean:
+        text += f"\nmedia {round(node.mean, 2)}"
+    label = _quote(text)
+    lines.append(f"\t{name} [label={label}]")
+    return name
+
+
+def _summary_line(lines, node):
+    """Nodo resumen (cantidad y rango de claves) en lugar del subárbol de node. O(altura)."""
+    lo = hi = node
+    while lo.left:
+        lo = lo.left
+    while hi.right:
+        hi = hi.right
+    name = _quote(f"...{node.iso3}")
+    label = _quote(f"{node.size} nodos\n[{lo.key[0]:.2f}, {hi.key[0]:.2f}]")
+    lines.append(f"\t{name} [label={label} shape=box style=dashed]")
+    return name
+
+
+def _emit_subtree(lines, root, levels=None):
+    """Emite root y sus descendientes; a partir de `levels` niveles quedan resumidos."""
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        name = _node_line(lines, node)
+        expand = levels is None or depth + 1 < levels
+        for child in (node.left, node.right):
+            if child:
+                child_name = _quote(child.iso3) if expand else _summary_line(lines, child)
+                lines.append(f"\t{name} -> {child_name}")
+        if expand:
+            if node.right:
+                stack.append((node.right, depth + 1))
+            if node.left:
+                stack.append((node.left, depth + 1))
+
+
+def tree_to_dot(root, max_depth=None):
+    """Genera el texto DOT del árbol (sin llamar a Graphviz).
+    Con max_depth solo se dibujan esos niveles y lo demás queda en nodos resumen."""
+    lines = ["digraph {"]
+    if root:
+        _emit_subtree(lines, root, max_depth)
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def focus_to_dot(node, radius=2):
+    """DOT con el camino desde la raíz hasta node y su vecindario de `radius` niveles.
+    Los hermanos del camino se muestran como nodos resumen."""
+    path = []
+    current = node
+    while current:
+        path.append(current)
+        current = current.parent
+    path.reverse()
+
+    lines = ["digraph {"]
+    for p, nxt in zip(path, path[1:]):
+        name = _node_line(lines, p)
+        for child in (p.left, p.right):
+            if child:
+                child_name = _quote(child.iso3) if child is nxt else _summary_line(lines, child)
+                lines.append(f"\t{name} -> {child_name}")
+    _emit_subtree(lines, node, radius + 1)
+    lines.append(f"\t{_quote(node.iso3)} [style=filled fillcolor=lightyellow]")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def render_dot(dot_text, filename, fmt="png"):
+    """Rasteriza un texto DOT con Graphviz (filename sin extensión)."""
+    # Import tardío: graphviz solo hace falta al generar la imagen
+    from graphviz import Source
+    Source(dot_text).render(filename, format=fmt, cleanup=True)
+
+
+def draw_tree(root, filename="tree", max_depth=None):
+    render_dot(tree_to_dot(root, max_depth), filename)
+
+
+class TreeRenderer:
+    """Render en segundo plano: agrupa las actualizaciones seguidas (debounce),
+    escribe el DOT en un hilo aparte y omite el render si el árbol no cambió."""
+
+    def __init__(self, filename="avl_tree", delay=0.3, raster=True, max_depth=None):
+        self.filename = filename
+        self.delay = delay
+        self.max_depth = max_depth  # niveles dibujados (None = todos)
+        self.raster = raster  # False: el hilo solo escribe el .dot; el PNG se hace en flush()
+        self.last_error = None
+
+        self._cond = threading.Condition()
+        self._render_lock = threading.Lock()
+        self._pending = None
+        self._deadline = 0.0
+        self._closed = False
+        self._thread = None
+        self._dot_hash = None
+        self._png_hash = None
+        self._last_dot = None
+
+    def update(self, root):
+        """Toma el estado actual del árbol (solo DOT, barato) y programa el render."""
+        dot = tree_to_dot(root, self.max_depth)
+        with self._cond:
+            self._pending = dot
+            self._deadline = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def flush(self):
+        """Procesa lo pendiente ya mismo y deja el PNG al día. Retorna la ruta del PNG."""
+        with self._render_lock:
+            with self._cond:
+                dot, self._pending = self._pending, None
+            if dot is not None:
+                self._write(dot, raster=True)
+            elif self._last_dot is not None and self._png_hash != self._dot_hash:
+                self._write(self._last_dot, raster=True)
+        if self.last_error:
+            error, self.last_error = self.last_error, None
+            raise error
+        return f"{self.filename}.png"
+
+    def close(self):
+        """Detiene el hilo dejando escrito el último estado."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+        with self._render_lock:
+            with self._cond:
+                dot, self._pending = self._pending, None
+            if dot is not None:
+                self._write(dot, raster=self.raster)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # Debounce: se espera a que dejen de llegar actualizaciones
+                remaining = self._deadline - time.monotonic()
+                while remaining > 0 and not self._closed:
+                    self._cond.wait(remaining)
+                    remaining = self._deadline - time.monotonic()
+            # Lo pendiente se toma con _render_lock tomado: flush() no puede ver "nada pendiente"
+            # mientras este hilo tiene un DOT todavía sin escribir
+            with self._render_lock:
+                with self._cond:
+                    dot, self._pending = self._pending, None
+                if dot is not None:
+                    self._write(dot, raster=self.raster)
+
+    def _write(self, dot, raster):
+        h = hash(dot)
+        try:
+            if h != self._dot_hash:
+                with open(f"{self.filename}.dot", "w", encoding="utf-8") as f:
+                    f.write(dot)
+                self._dot_hash = h
+                self._last_dot = dot
+            if raster and h != self._png_hash:
+                render_dot(dot, self.filename)
+                self._png_hash = h
+        except Exception as e:
+            self.last_error = e